@@ -1,7 +1,15 @@
 from tkinter import *
+import argparse
+import heapq
 import json
+import os
+import time
+from contextlib import redirect_stdout
 from game_texts import *
 from items import *
+from session_log import recorded, ReplayError, SessionRecorder, SessionReplay, RecordingSocket, ReplaySocket
+from profiler import Profiler
+from world_state import WorldState, VISITED, CLEARED
 import zmq
 
 
@@ -37,8 +45,28 @@ class Item:
 class GameLogic:
     """A class that holds the logic for running an instance of the game and communicating with microservices."""
 
+    # Movement cost of a tile by biome when planning a route, tiles of unlisted biomes cost 1
+    BIOME_COSTS = {
+        "plains": 1,
+        "forest": 2,
+        "swamp": 3,
+        "mountain": 4
+    }
+    # Number of times a route may be re-planned after the map service reveals a blocked tile
+    MAX_REPLANS = 10
+    # Furthest a single journey may travel, counted in steps along the axes
+    MAX_TRAVEL_DISTANCE = 100
+    # Number of tiles A* may expand before giving up on a route
+    MAX_ROUTE_SEARCH = 20000
+    # Most tiles requested from the map service in one batched request
+    MAX_BATCH_TILES = 256
+
     def __init__(self):
         """Initialize the game instance, defined by player character save data and other factors."""
+        # Session recording and replay are off until requested
+        self._recorder = None
+        self._replay = None
+        self._world = WorldState()
         self.reset()
 
         # Establish microservice communication routes
@@ -79,8 +107,10 @@ class GameLogic:
             self._socks['map'].send_json(msg)
             reply = self._socks['map'].recv_json()
             print(f"Received map response: {reply}")
+            self._cache_tile(destination, reply)
             if reply["status"] == "success":
                 self._player.position[1] = destination
+                self._world.mark(self._player.position[0], destination[0], destination[1], VISITED)
                 for key in reply['data'].keys():
                     self._tile_info[key] = reply['data'][key]
             elif reply["status"] == "error" or reply["status"] == "out_of_bounds":
@@ -93,18 +123,49 @@ class GameLogic:
         except zmq.ZMQError as e:
             return {"status": "error", "message": f"ZMQ failure: {e}"}
 
-    def _send_value_request(self):
+    def _send_map_batch_request(self, coords_list):
+        """Send requests to the map service for the information of several tiles at once without moving the player,
+        at most MAX_BATCH_TILES tiles per request. Each tile reply is stored in the known tile cache. Returns False if
+        a batch could not be fetched."""
+        for start in range(0, len(coords_list), self.MAX_BATCH_TILES):
+            batch = coords_list[start:start + self.MAX_BATCH_TILES]
+            msg = {
+                "service_key": "rpg",
+                "data": {
+                    "map": self._player.position[0],
+                    "coords_batch": batch
+                }
+            }
+
+            print(f"Sending map batch request: {msg}")
+            try:
+                self._socks['map'].send_json(msg)
+                reply = self._socks['map'].recv_json()
+                print(f"Received map batch response: {reply}")
+            except (zmq.Again, zmq.ZMQError) as e:
+                return False
+            if reply.get("status") != "success" or len(reply.get("data", [])) != len(batch):
+                return False
+            for coords, tile_reply in zip(batch, reply["data"]):
+                self._cache_tile(coords, tile_reply)
+        return True
+
+    def _send_value_request(self, count=1):
         """ Send a request to the random value generator for a random number in range 1 to 100. If a failure occurs,
-        simply return a default value of 50"""
-        msg = [1]
+        simply return a default value of 50. When more than one value is requested a list of values is returned."""
+        msg = [count]
         print(f"Sending random value request: {msg}")
         try:
             self._socks['random'].send_json(msg)
             reply = self._socks['random'].recv_json()
             print(f"Received random value response: {reply}")
-            return reply
         except (zmq.Again, zmq.ZMQError) as e:
-            return 50
+            return 50 if count == 1 else [50] * count
+        if count == 1:
+            return reply
+        # If the service returned fewer values than requested, request the remainder one at a time
+        values = reply[:count] if isinstance(reply, list) else [reply]
+        return values + [self._send_value_request() for _ in range(count - len(values))]
 
     def _send_enemy_request(self):
         """Send a request to the enemy service for an enemy from the current biome"""
@@ -153,6 +214,7 @@ class GameLogic:
         except (zmq.Again, zmq.ZMQError) as e:
             return
 
+    @recorded
     def move_player(self, direction):
         """Calculates the new position of the player based on the input from the UI, calls the map request method and
         then returns the response from the map program to the UI for display."""
@@ -162,10 +224,157 @@ class GameLogic:
         elif direction == "south": y -= 1
         elif direction == "west": x -= 1
         self._send_map_request([x, y])
-
-        self._weather_count -= 1
-        if self._weather_count == 0:
-            self._weather_count += 5
+        self._advance_weather()
+
+    @recorded
+    def travel_to(self, x, y):
+        """Travels the player toward (x, y) along a route planned with A* over the known tiles. Unexplored tiles on the
+        route are fetched in one batched map request and the encounters for the whole route are rolled at once.
+        Returns True if the journey is interrupted by an encounter, False if the player arrives, or None if no route
+        could be found or the destination is further than MAX_TRAVEL_DISTANCE."""
+        goal = (x, y)
+        if not self.within_travel_range(x, y):
+            return None
+        # Tiles the map service could not describe are avoided for the rest of the journey and not requested again
+        unavailable = set()
+        path = self._plan_route(tuple(self._player.position[1]), goal)
+        for _ in range(self.MAX_REPLANS):
+            if path is None:
+                return None
+            # Fetch the tiles beside the route as well, so a detour around a blocked tile is usually already known
+            corridor = dict.fromkeys((px + dx, py + dy) for px, py in path
+                                     for dx, dy in ((0, 0), (0, 1), (1, 0), (0, -1), (-1, 0)))
+            unknown = [list(step) for step in corridor
+                       if step not in unavailable and self._tile_key(step) not in self._known_tiles]
+            if unknown and not self._send_map_batch_request(unknown):
+                return self._step_route(path)
+            unavailable.update(tuple(step) for step in unknown if self._tile_key(step) not in self._known_tiles)
+            if all(self._known_tiles.get(self._tile_key(step)) is not None for step in path):
+                break
+            # The map service revealed a blocked or unavailable tile along the route, so plan around it
+            path = self._plan_route(tuple(self._player.position[1]), goal, unavailable)
+        else:
+            return None
+        return self._walk_route(path)
+
+    def within_travel_range(self, x, y):
+        """Returns True if (x, y) is no more than MAX_TRAVEL_DISTANCE steps from the player."""
+        start_x, start_y = self._player.position[1]
+        return abs(x - start_x) + abs(y - start_y) <= self.MAX_TRAVEL_DISTANCE
+
+    def _tile_key(self, coords):
+        """Returns the key of a tile on the current map in the known tile cache."""
+        return self._player.position[0], coords[0], coords[1]
+
+    def _cache_tile(self, coords, reply):
+        """Stores a map service reply in the known tile cache. Out of bounds tiles are stored as None."""
+        if reply["status"] == "success":
+            self._known_tiles[self._tile_key(coords)] = reply['data']
+        elif reply["status"] == "out_of_bounds":
+            self._known_tiles[self._tile_key(coords)] = None
+
+    def _tile_cost(self, coords):
+        """Returns the cost of moving onto a tile, unexplored tiles are assumed to be open ground."""
+        tile = self._known_tiles.get(self._tile_key(coords))
+        if tile is None:
+            return 1
+        return self.BIOME_COSTS.get(tile.get('biome'), 1) + tile.get('encounter', 0) / 100
+
+    def _plan_route(self, start, goal, avoid=()):
+        """Plans the cheapest route from start to goal with A*, avoiding known out of bounds tiles and any tiles in
+        avoid. Returns the list of tiles to step on excluding the start, or None if the goal cannot be reached."""
+        map_name = self._player.position[0]
+        blocked = {(x, y) for (name, x, y), tile in self._known_tiles.items() if name == map_name and tile is None}
+        blocked.update(avoid)
+        if goal in blocked:
+            return None
+
+        # The map is unbounded until explored, so limit the search to a box around the start, goal and known walls
+        xs = [start[0], goal[0]] + [x for x, _ in blocked]
+        ys = [start[1], goal[1]] + [y for _, y in blocked]
+        min_x, max_x, min_y, max_y = min(xs) - 1, max(xs) + 1, min(ys) - 1, max(ys) + 1
+
+        # Ties are broken toward the tile furthest along its route, otherwise open ground with equal estimates would
+        # be expanded across the whole box between the start and goal
+        frontier = [(0, 0, start)]
+        came_from = {start: None}
+        cost_so_far = {start: 0}
+        expanded = 0
+        while frontier:
+            _, negative_cost, current = heapq.heappop(frontier)
+            cost = -negative_cost
+            if current == goal:
+                break
+            if cost > cost_so_far[current]:
+                continue
+            expanded += 1
+            if expanded > self.MAX_ROUTE_SEARCH:
+                return None
+            for dx, dy in ((0, 1), (1, 0), (0, -1), (-1, 0)):
+                step = (current[0] + dx, current[1] + dy)
+                if step in blocked or not (min_x <= step[0] <= max_x and min_y <= step[1] <= max_y):
+                    continue
+                new_cost = cost + self._tile_cost(step)
+                if step not in cost_so_far or new_cost < cost_so_far[step]:
+                    cost_so_far[step] = new_cost
+                    came_from[step] = current
+                    priority = new_cost + abs(goal[0] - step[0]) + abs(goal[1] - step[1])
+                    heapq.heappush(frontier, (priority, -new_cost, step))
+        else:
+            return None
+
+        path = []
+        current = goal
+        while current != start:
+            path.append(current)
+            current = came_from[current]
+        path.reverse()
+        return path
+
+    def _walk_route(self, path):
+        """Walks the player along a fully known route, rolling every encounter in one request and stopping at the first
+        tile where an encounter occurs. Returns True if an encounter interrupted the journey."""
+        if not path:
+            return False
+        rolls = self._send_value_request(len(path))
+        if not isinstance(rolls, list):
+            rolls = [rolls]
+        steps = len(path)
+        encounter = False
+        for index, step in enumerate(path):
+            tile = self._known_tiles.get(self._tile_key(step)) or {}
+            if rolls[index] <= tile.get('encounter', 0):
+                steps = index + 1
+                encounter = True
+                break
+
+        for x, y in path[:steps]:
+            self._world.mark(self._player.position[0], x, y, VISITED)
+        destination = path[steps - 1]
+        self._player.position[1] = list(destination)
+        for key, value in (self._known_tiles.get(self._tile_key(destination)) or {}).items():
+            self._tile_info[key] = value
+        self._advance_weather(steps)
+        return encounter
+
+    def _step_route(self, path):
+        """Walks the player along a route one map request at a time, used when the map service cannot answer batched
+        requests. Returns True if an encounter interrupted the journey, False if the player arrives, or None if a step
+        turns out to be out of bounds or the map service fails."""
+        for step in path:
+            self._send_map_request(list(step))
+            self._advance_weather()
+            if self._player.position[1] != list(step):
+                return None
+            if self.evaluate_encounter():
+                return True
+        return False
+
+    def _advance_weather(self, steps=1):
+        """Counts down the steps until the next weather change, requesting new weather when the count runs out."""
+        self._weather_count -= steps
+        if self._weather_count <= 0:
+            self._weather_count = self._weather_count % 5 or 5
             self._send_weather_request()
 
     def get_narration(self):
@@ -179,6 +388,7 @@ class GameLogic:
         """Returns the inspection of the current tile information"""
         return self._tile_info["inspection"]
 
+    @recorded
     def evaluate_encounter(self):
         """Calculates the chance of a battle occurring, returning accordingly"""
         chance = self._send_value_request()
@@ -187,6 +397,7 @@ class GameLogic:
         else:
             return True
 
+    @recorded
     def get_enemy(self):
         """Sets the value of the enemy property by using the enemy service"""
         if self._current_enemy['health'] <= 0:
@@ -194,6 +405,7 @@ class GameLogic:
             self._current_enemy = enemy
         return self._current_enemy
 
+    @recorded
     def flee(self):
         """Calls on the random value generator to determine a 50% chance to flee"""
         chance = self._send_value_request()
@@ -203,6 +415,7 @@ class GameLogic:
             self._current_enemy['health'] = 0
             return True
 
+    @recorded
     def reset(self):
         """Resets the game for a new file"""
         self._player = Player({
@@ -229,6 +442,8 @@ class GameLogic:
         }
         self._weather = 'Sunny'
         self._weather_count = 5
+        self._known_tiles = {}
+        self._world.clear()
 
     def get_enemy_health(self):
         """Returns the current enemy's health"""
@@ -238,49 +453,89 @@ class GameLogic:
         """Returns the stats of the player object"""
         return self._player.stats['health']
 
+    @recorded
     def battle_turn(self):
         """Public function to simulate a turn of battle"""
         player, enemy = self._send_battle_request()
         self._player.stats['health'] = player['health']
         self._current_enemy['health'] = enemy['health']
 
+        # Remember that the enemy on this tile was defeated
+        if self._current_enemy['health'] <= 0:
+            map_name, (x, y) = self._player.position
+            self._world.mark(map_name, x, y, CLEARED)
+            self._world.increment(map_name, x, y)
+
+    def is_visited(self, x, y):
+        """Returns True if the player has stood on the tile of the current map."""
+        return self._world.visited(self._player.position[0], x, y)
+
+    def is_cleared(self, x, y):
+        """Returns True if the player has defeated an enemy on the tile of the current map."""
+        return self._world.cleared(self._player.position[0], x, y)
+
+    @recorded
     def load_player(self):
         """Access the save_file.json file get information to create a previously saved player object."""
+        # The world state lives beside the save file, it is left alone during a replay to keep the replay exact
+        if self._replay is None:
+            self._world.load()
+        try:
+            contents = self._read_save_file()
+            if not contents:
+                return
+            else:
+                player_data = json.loads(contents)
+                # Rebuild inventory from item library
+                if "inventory" in player_data:
+                    player_data["inventory"] = [
+                        ITEM_LOG[name] for name in player_data["inventory"] if name in ITEM_LOG]
+                self._player = Player(player_data)
+        except json.JSONDecodeError:
+            return
+
+    def _read_save_file(self):
+        """Returns the contents of the save_file.json file, or an empty string if there is none. The contents are
+        recorded like a service reply so that loads can be replayed."""
+        if self._replay is not None:
+            return self._replay.next_reply('save')
         try:
             with open('save_file.json', 'r') as save_data:
                 contents = save_data.read().strip()
-                if not contents:
-                    return
-                else:
-                    player_data = json.loads(contents)
-                    # Rebuild inventory from item library
-                    if "inventory" in player_data:
-                        player_data["inventory"] = [
-                            ITEM_LOG[name] for name in player_data["inventory"] if name in ITEM_LOG]
-                    self._player = Player(player_data)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return
+        except FileNotFoundError:
+            contents = ''
+        if self._recorder is not None:
+            self._recorder.record_reply('save', contents)
+        return contents
 
+    @recorded
     def save_player(self):
         """Access the save_file.json file and overwrite information to store current player object."""
+        # A replayed session must not overwrite the player's real save file
+        if self._replay is not None:
+            return
         player_data = vars(self._player).copy()
         player_data["inventory"] = [item.name for item in self._player.inventory]
         try:
             with open('save_file.json', 'w') as save_data:
                 json.dump(player_data, save_data)
+            self._world.save()
         except Exception as e:
             print(f'error saving player data: {e}')
 
+    @recorded
     def add_item(self, item):
         """Adds an item to the player character's inventory."""
         self._player.inventory.append(item)
         item.equip_effect(self._player)
 
+    @recorded
     def remove_item(self, item):
         """Removes an item from the player character's inventory."""
         if item in self._player.inventory:
             self._player.inventory.remove(item)
 
+    @recorded
     def use_item(self, item):
         """Uses the apply effect of an item in the player character's inventory."""
         item.apply_effect(self._player)
@@ -290,6 +545,43 @@ class GameLogic:
         """Returns a list of the player's inventory defined by name, narration, and description."""
         return self._player.inventory
 
+    def start_recording(self, path):
+        """Begins recording every player action and service reply to a session log at the given path."""
+        self._recorder = SessionRecorder(path)
+        self._socks = {name: RecordingSocket(sock, name, self._recorder) for name, sock in self._socks.items()}
+
+    def stop_recording(self):
+        """Stops recording and closes the session log."""
+        if self._recorder is None:
+            return
+        self._socks = {name: sock._sock for name, sock in self._socks.items()}
+        self._recorder.close()
+        self._recorder = None
+
+    def replay(self, path, live=False):
+        """Runs the player actions of a session log back from a fresh game. The recorded service replies are used
+        unless live is True, in which case the requests go to the running services. Returns the number of actions
+        replayed and the seconds taken. A log that was never closed may end with an action whose replies were not
+        recorded, that action is treated as the end of the log."""
+        self._replay = SessionReplay(path)
+        if not live:
+            self._socks = {name: ReplaySocket(name, self._replay) for name in self._socks}
+        self.reset()
+
+        actions = self._replay.actions
+        replayed = len(actions)
+        start = time.perf_counter()
+        for index, (name, args) in enumerate(actions):
+            # Items are logged by name, so look them back up in the item library
+            args = [ITEM_LOG[arg["item"]] if isinstance(arg, dict) and "item" in arg else arg for arg in args]
+            try:
+                getattr(self, name)(*args)
+            except ReplayError:
+                if index != len(actions) - 1:
+                    raise
+                replayed = index
+        return replayed, time.perf_counter() - start
+
     def player_display(self):
         """Returns a string of the player stats to be displayed in a label."""
         return textwrap.dedent(f"""
@@ -316,10 +608,14 @@ class GameLogic:
 class UI:
     """A class that presents the UI to the user and calls on the GameLogic object in according to user input"""
 
-    def __init__(self, game_logic):
+    def __init__(self, game_logic, profiler=None):
         # Inherit the game logic object
         self._game_logic = game_logic
 
+        # Time every handler when profiling, before any of them are bound to widgets
+        if profiler is not None:
+            profiler.instrument(self)
+
         # Establish root window
         self._root = Tk()
         self._root.geometry("1000x800")
@@ -341,13 +637,23 @@ class UI:
         self._east_button = Button(self._direction_frame, text='East', command=lambda: self._move('east'))
         self._south_button = Button(self._direction_frame, text='South', command=lambda: self._move('south'))
         self._west_button = Button(self._direction_frame, text='West', command=lambda: self._move('west'))
+        self._travel_button = Button(self._direction_frame, text='Go', command=self._travel_page)
         self._inventory_button = Button(self._inventory_frame, text='Inventory', command=self._inventory_page)
         self._inspect_button = Button(self._inspect_frame, text='Inspect', command=self._inspect_page)
         self._stats_button = Button(self._stats_frame, text='Stats', command=self._stats_page)
 
-        # Establish and initialize text window frame
+        # Place the buttons into the control frames, the frames are shown once the game begins
+        self._north_button.place(relx=0.5, rely=0.0, anchor="n")
+        self._east_button.place(relx=1, rely=0.5, anchor="e")
+        self._south_button.place(relx=0.5, rely=1, anchor="s")
+        self._west_button.place(relx=0, rely=0.5, anchor="w")
+        self._travel_button.place(relx=0.5, rely=0.5, anchor="center")
+        self._inventory_button.pack(expand=True, fill="both")
+        self._inspect_button.pack(expand=True, fill="both")
+        self._stats_button.pack(expand=True, fill="both")
+
+        # Establish text window frame
         self._text_window = Frame(self._root)
-        self._text_window.place(relx=0, rely=0, relwidth=1, relheight=.8)
 
         # Establish labels that will switch out in text window frame
         self._text_label = Label(self._text_window,
@@ -359,23 +665,21 @@ class UI:
         self._lower_desc_label = Label(self._text_window, wraplength=800, justify='left')
         self._inspection_label = Label(self._text_window, wraplength=800, justify='left')
         self._stats_label = Label(self._text_window, wraplength=800, justify='left')
+        self._inv_listbox.bind("<<ListboxSelect>>", self._on_inv_select)
 
-        # Initialize each widget and then lift the primary text label
+        # Initialize each widget, the screens decide which of them is lifted to the front
         for frame in (self._text_label, self._inspection_label, self._stats_label):
             frame.place(relx=0, rely=0, relwidth=1, relheight=1)
         self._inv_listbox.place(relx=0, rely=0, relwidth=1, relheight=0.5)
         self._upper_desc_label.place(relx=0, rely=0, relwidth=1, relheight=0.5)
         self._lower_desc_label.place(relx=0, rely=0.5, relwidth=1, relheight=0.5)
-        self._text_label.lift()
 
-        # Initialize bottom of text window for button placements & initialize ready button
+        # Establish bottom of text window for button placements & the ready button
         self._bottom_window = Frame(self._root)
-        self._bottom_window.place(relx=0, rely=0.8, relwidth=1, relheight=.2)
         self._ready_button = Button(self._bottom_window,
                                     text="I'm Ready!",
                                     command=self._ready,
                                     bg='#9c9c9c')
-        self._ready_button.place(relx=0.5, rely=0.25, anchor='center')
 
         # Establish Bottom Pane buttons for later use
         self._help_button = Button(self._bottom_window, text='Help', command=self._help_page)
@@ -397,15 +701,142 @@ class UI:
                                        command=self._load_initial_save,
                                        bg='#9c9c9c')
 
+        # Establish the pop-up windows, hidden until they are needed
+        self._help_popup, self._help_label = self._build_popup('WE COULD ALL USE A LITTLE HELP SOMETIMES', HELP_TEXT)
+        self._load_warning_popup, self._load_warning_label = self._build_popup('SLOW YOUR ROLL', LOAD_WARNING_TEXT)
+        self._yes_load_button = Button(self._load_warning_popup, text='YES',
+                                       command=lambda: (self._reload(),
+                                                        self._load_warning_popup.withdraw()))
+        self._yes_load_button.place(relx=0.4, rely=0.8, anchor='center')
+        self._no_load_button = Button(self._load_warning_popup, text='NO', command=self._load_warning_popup.withdraw)
+        self._no_load_button.place(relx=0.6, rely=0.8, anchor='center')
+        self._travel_popup, self._travel_label = self._build_popup('WHERE TO, ADVENTURER?', TRAVEL_TEXT)
+        self._travel_x_entry = Entry(self._travel_popup, width=5, justify='center')
+        self._travel_x_entry.place(relx=0.4, rely=0.5, anchor='center')
+        self._travel_y_entry = Entry(self._travel_popup, width=5, justify='center')
+        self._travel_y_entry.place(relx=0.6, rely=0.5, anchor='center')
+        self._go_travel_button = Button(self._travel_popup, text='GO', command=self._travel)
+        self._go_travel_button.place(relx=0.5, rely=0.8, anchor='center')
+
+        # Describe every screen once, then show the intro screen
+        self._screens = self._build_screens()
+        self._screen = None
+        self._placed = {}
+        self._configured = {}
+        self._raised = ()
+        self._show_screen('intro')
+
         # Initialize the UI
+        if profiler is not None:
+            profiler.start_heartbeat(self._root)
         self._root.mainloop()
 
+    def _build_screens(self):
+        """Describes each screen by the widgets it places, the options of the widgets it configures and the widgets it
+        lifts to the front of the text window."""
+        title_layout = {
+            self._text_window: dict(relx=0, rely=0, relwidth=1, relheight=.8),
+            self._bottom_window: dict(relx=0, rely=0.8, relwidth=1, relheight=.2)
+        }
+        game_layout = {
+            self._text_window: dict(relx=0, rely=0, relwidth=.8, relheight=.8),
+            self._bottom_window: dict(relx=0, rely=0.8, relwidth=.8, relheight=.2),
+            self._direction_frame: dict(relx=0.8, rely=0, relwidth=.2, relheight=.25),
+            self._inventory_frame: dict(relx=0.8, rely=0.25, relwidth=.2, relheight=.25),
+            self._inspect_frame: dict(relx=0.8, rely=0.5, relwidth=.2, relheight=.25),
+            self._stats_frame: dict(relx=0.8, rely=0.75, relwidth=.2, relheight=.25),
+            self._help_button: dict(relx=0, rely=1, anchor='sw'),
+            self._return_button: dict(relx=1, rely=1, anchor='se')
+        }
+        left = dict(relx=0.4, rely=0.25, anchor="center")
+        right = dict(relx=0.6, rely=0.25, anchor="center")
+        movement = (self._north_button, self._east_button, self._south_button, self._west_button,
+                    self._travel_button)
+        control_panel = (self._stats_button, self._inventory_button, self._inspect_button)
+
+        def title_screen(placed):
+            """Returns a screen shown before the game begins."""
+            return {'placed': {**title_layout, **placed}, 'configured': {}, 'raised': (self._text_label,)}
+
+        def game_screen(placed=None, disabled=(), raised=(self._text_label,)):
+            """Returns a screen of the game, every control not listed as disabled is enabled."""
+            configured = {button: {'state': 'disabled' if button in disabled else 'normal'}
+                          for button in movement + control_panel + (self._return_button,)}
+            return {'placed': {**game_layout, **(placed or {})}, 'configured': configured, 'raised': raised}
+
+        screens = {
+            'intro': title_screen({self._ready_button: dict(relx=0.5, rely=0.25, anchor='center')}),
+            'load': title_screen({self._new_file_button: left, self._continue_button: right}),
+            'explore': game_screen(),
+            'inspect': game_screen(disabled=(self._inspect_button,)),
+            'inventory': game_screen({self._use_item_button: left, self._discard_item_button: right},
+                                     movement + (self._inventory_button,),
+                                     (self._inv_listbox, self._lower_desc_label)),
+            'stats': game_screen({self._save_file_button: left, self._load_file_button: right},
+                                 movement + (self._stats_button,),
+                                 (self._stats_label,)),
+            'battle': game_screen({self._attack_button: left, self._flee_button: right},
+                                  movement + control_panel + (self._return_button,),
+                                  (self._upper_desc_label, self._lower_desc_label)),
+            'outcome': game_screen(disabled=movement + control_panel),
+            'game_over': game_screen({self._new_file_button: left, self._continue_button: right},
+                                     movement + control_panel + (self._return_button,))
+        }
+        # A failed escape is shown on the flee button, so each battle starts with it restored
+        screens['battle']['configured'][self._flee_button] = {'state': 'normal', 'text': 'Flee'}
+        return screens
+
+    def _show_screen(self, name):
+        """Switches to a screen, touching only the widgets whose placement, options or stacking differ from the
+        current screen."""
+        screen = self._screens[name]
+
+        # Hide the widgets the new screen does not use, then place the ones that are new or have moved
+        for widget in [widget for widget in self._placed if widget not in screen['placed']]:
+            widget.place_forget()
+            del self._placed[widget]
+        for widget, options in screen['placed'].items():
+            if self._placed.get(widget) != options:
+                widget.place(**options)
+                self._placed[widget] = options
+
+        for widget, options in screen['configured'].items():
+            self._configure(widget, **options)
+
+        if screen['raised'] != self._raised:
+            for widget in screen['raised']:
+                widget.lift()
+            self._raised = screen['raised']
+        self._screen = name
+
+    def _configure(self, widget, **options):
+        """Applies the options to a widget that differ from those it was last given."""
+        current = self._configured.setdefault(widget, {})
+        changed = {key: value for key, value in options.items() if current.get(key) != value}
+        if changed:
+            widget.config(**changed)
+            current.update(changed)
+
+    def _build_popup(self, title, text):
+        """Builds a hidden pop-up window with a label, closing it hides it again so it can be reused."""
+        popup = Toplevel(self._root)
+        popup.withdraw()
+        popup.geometry('500x400')
+        popup.title(title)
+        popup.protocol('WM_DELETE_WINDOW', popup.withdraw)
+        label = Label(popup, text=text, wraplength=400)
+        label.pack()
+        return popup, label
+
+    def _show_popup(self, popup):
+        """Brings a hidden pop-up window back in front of the game."""
+        popup.deiconify()
+        popup.lift()
+
     def _ready(self):
         """Responds user clicking the ready button and moves to the next page offering the chance to load save data"""
+        self._show_screen('load')
         self._text_label.config(text=LOAD_TEXT)
-        self._ready_button.place_forget()
-        self._new_file_button.place(relx=0.4, rely=0.25, anchor="center")
-        self._continue_button.place(relx=0.6, rely=0.25, anchor="center")
 
     def _load_new_save(self):
         """Loads the game with a new save file"""
@@ -419,35 +850,7 @@ class UI:
 
     def _initiate_game(self):
         """Initiates the gameplay portion of the UI."""
-        # Reshape the text windows
-        self._text_window.place_configure(relx=0, rely=0, relwidth=.8, relheight=.8)
-        self._bottom_window.place_configure(relx=0, rely=0.8, relwidth=.8, relheight=.2)
-
-        # Remove the new/continue buttons
-        self._new_file_button.place_forget()
-        self._continue_button.place_forget()
-
-        # Place the frames for the controls onto the UI
-        self._direction_frame.place(relx=0.8, rely=0, relwidth=.2, relheight=.25)
-        self._inventory_frame.place(relx=0.8, rely=0.25, relwidth=.2, relheight=.25)
-        self._inspect_frame.place(relx=0.8, rely=0.5, relwidth=.2, relheight=.25)
-        self._stats_frame.place(relx=0.8, rely=0.75, relwidth=.2, relheight=.25)
-
-        # Place the buttons into the control frames
-        self._north_button.place(relx=0.5, rely=0.0, anchor="n")
-        self._east_button.place(relx=1, rely=0.5, anchor="e")
-        self._south_button.place(relx=0.5, rely=1, anchor="s")
-        self._west_button.place(relx=0, rely=0.5, anchor="w")
-        self._inventory_button.pack(expand=True, fill="both")
-        self._inspect_button.pack(expand=True, fill="both")
-        self._stats_button.pack(expand=True, fill="both")
-        self._help_button.place(relx=0, rely=1, anchor='sw')
-        self._return_button.place(relx=1, rely=1, anchor='se')
-
-        # Restore control panel and return in case this is a reload
-        self._enable_movement()
-        self._enable_control_panel()
-        self._return_button.config(state='normal')
+        self._show_screen('explore')
 
         # Load the current tile narration
         self._game_logic.move_player(None)
@@ -456,14 +859,7 @@ class UI:
 
     def _return(self):
         """Places the text window that holds narration at the front of the screen."""
-        # Remove unneeded widgets
-        self._remove_item_buttons()
-        self._remove_save_buttons()
-
-        # Enable any disabled controls and lift the text window
-        self._enable_control_panel()
-        self._enable_movement()
-        self._text_label.lift()
+        self._show_screen('explore')
 
         # Return on screen text to tile narrative
         narration = self._game_logic.get_narration()
@@ -478,20 +874,43 @@ class UI:
             narration = self._game_logic.get_narration()
             self._text_label.config(text=narration)
 
+    def _travel_page(self):
+        """Shows the pop-up window asking the player for the coordinates they would like to travel to."""
+        self._travel_label.config(text=TRAVEL_TEXT)
+        self._travel_x_entry.delete(0, END)
+        self._travel_y_entry.delete(0, END)
+        self._show_popup(self._travel_popup)
+
+    def _travel(self):
+        """Calls to the game_logic to travel the player to the coordinates entered in the travel pop-up."""
+        # The pop-up may have been left open while the player moved into a battle or another screen
+        if self._screen not in ('explore', 'inspect'):
+            self._travel_popup.withdraw()
+            return
+        try:
+            x = int(self._travel_x_entry.get())
+            y = int(self._travel_y_entry.get())
+        except ValueError:
+            self._travel_label.config(text=TRAVEL_TEXT + TRAVEL_INVALID_TEXT)
+            return
+        self._travel_popup.withdraw()
+        if not self._game_logic.within_travel_range(x, y):
+            self._text_label.config(text=TRAVEL_TOO_FAR_TEXT)
+            return
+
+        encounter = self._game_logic.travel_to(x, y)
+        if encounter is None:
+            self._text_label.config(text=NO_ROUTE_TEXT)
+        elif encounter:
+            self._battle_page()
+        else:
+            narration = self._game_logic.get_narration()
+            self._text_label.config(text=narration)
+
     def _battle_page(self, mid_battle=False):
         """Restructures the UI for a battle encounter and uses the game logic to determine the outcome"""
         if not mid_battle:
-            # Remove or disable unneeded widgets
-            self._disable_movement()
-            self._disable_control_panel()
-            self._remove_save_buttons()
-            self._return_button.config(state='disabled')
-
-            # Bring up Battle UI
-            self._attack_button.place(relx=0.4, rely=0.25, anchor="center")
-            self._flee_button.place(relx=0.6, rely=0.25, anchor="center")
-            self._upper_desc_label.lift()
-            self._lower_desc_label.lift()
+            self._show_screen('battle')
 
             # This call loads in a new enemy
             self._game_logic.get_enemy()
@@ -515,13 +934,11 @@ class UI:
         if self._game_logic.flee():
             self._victory_and_flee_page(False)
         else:
-            self._flee_button.config(state='disabled', text='Failure!')
+            self._configure(self._flee_button, state='disabled', text='Failure!')
 
     def _victory_and_flee_page(self, victory=True):
         """Displays that the player is victorious and sets up return to exploration."""
-        self._remove_battle_buttons()
-        self._return_button.config(state='normal')
-        self._text_label.lift()
+        self._show_screen('outcome')
         if victory:
             self._text_label.config(text="VICTORY!")
         else:
@@ -529,28 +946,12 @@ class UI:
 
     def _game_over_page(self):
         """Occurs if the player dies, offers to load a previous save or start new file."""
-        self._remove_battle_buttons()
-        self._text_label.lift()
+        self._show_screen('game_over')
         self._text_label.config(text=GAME_OVER)
-        self._new_file_button.place(relx=0.4, rely=0.25, anchor="center")
-        self._continue_button.place(relx=0.6, rely=0.25, anchor="center")
 
     def _inventory_page(self):
         """Restructures the text window according to the inventory of the player character."""
-        # Remove or disable unneeded widgets
-        self._disable_movement()
-        self._enable_control_panel()
-        self._remove_save_buttons()
-        self._inventory_button.config(state='disabled')
-
-        # Bring up Inventory UI
-        self._inv_listbox.lift()
-        self._lower_desc_label.lift()
-        self._use_item_button.place(relx=0.4, rely=0.25, anchor="center")
-        self._discard_item_button.place(relx=0.6, rely=0.25, anchor="center")
-
-        # UI logic
-        self._inv_listbox.bind("<<ListboxSelect>>", self._on_inv_select)
+        self._show_screen('inventory')
 
         # Clear and then Populate item list
         self._inv_listbox.delete(0, END)
@@ -601,39 +1002,19 @@ class UI:
 
     def _inspect_page(self):
         """Inspects the environment, fetching additional text information for the user to read."""
-        self._return()
-        self._inspect_button.config(state='disabled')
+        self._show_screen('inspect')
 
         narration = self._game_logic.get_inspection()
         self._text_label.config(text=narration)
 
     def _stats_page(self):
         """Restructures the text window according to the stats of the player character."""
-        # Remove or disable unneeded widgets
-        self._disable_movement()
-        self._enable_control_panel()
-        self._remove_item_buttons()
-        self._stats_button.config(state='disabled')
-
-        # Bring up stats UI
-        self._stats_label.lift()
+        self._show_screen('stats')
         self._stats_label.config(text=self._game_logic.player_display())
-        self._save_file_button.place(relx=0.4, rely=0.25, anchor="center")
-        self._load_file_button.place(relx=0.6, rely=0.25, anchor="center")
 
     def _load_warning(self):
         """Loads the saved player data after warning player about losing current state"""
-        self._load_warning_popup = Toplevel(self._root)
-        self._load_warning_popup.geometry('500x400')
-        self._load_warning_popup.title('SLOW YOUR ROLL')
-        self._load_warning_label = Label(self._load_warning_popup, text=LOAD_WARNING_TEXT, wraplength=400)
-        self._load_warning_label.pack()
-        self._yes_load_button = Button(self._load_warning_popup, text='YES',
-                                       command=lambda: (self._reload(),
-                                                        self._load_warning_popup.destroy()))
-        self._yes_load_button.place(relx=0.4, rely=0.8, anchor='center')
-        self._no_load_button = Button(self._load_warning_popup, text='NO', command=self._load_warning_popup.destroy)
-        self._no_load_button.place(relx=0.6, rely=0.8, anchor='center')
+        self._show_popup(self._load_warning_popup)
 
     def _reload(self):
         """Helper function that ensures a refresh of the stats page when reloading previous save"""
@@ -641,55 +1022,43 @@ class UI:
         self._stats_page()
 
     def _help_page(self):
-        """Deploys a pop-up window to remind the player of the control scheme."""
-        self._help_popup = Toplevel(self._root)
-        self._help_popup.geometry('500x400')
-        self._help_popup.title('WE COULD ALL USE A LITTLE HELP SOMETIMES')
-        self._help_label = Label(self._help_popup, text=HELP_TEXT, wraplength=400)
-        self._help_label.pack()
-
-    def _disable_movement(self):
-        """Disables the movement buttons while on the non-exploration screens"""
-        for button in (self._north_button, self._east_button, self._south_button, self._west_button):
-            button.config(state='disabled')
-
-    def _enable_movement(self):
-        """Enables the movement buttons while on the non-exploration screens"""
-        for button in (self._north_button, self._east_button, self._south_button, self._west_button):
-            button.config(state='normal')
-
-    def _enable_control_panel(self):
-        """Restores all the control panel buttons from the UI."""
-        for button in (self._stats_button, self._inventory_button, self._inspect_button):
-            button.config(state='normal')
-
-    def _disable_control_panel(self):
-        """Restores all the control panel buttons from the UI."""
-        for button in (self._stats_button, self._inventory_button, self._inspect_button):
-            button.config(state='disabled')
-
-    def _remove_battle_buttons(self):
-        """Remove the attack and flee buttons from the UI."""
-        if self._attack_button.winfo_ismapped:
-            self._attack_button.place_forget()
-        if self._flee_button.winfo_ismapped:
-            self._flee_button.place_forget()
-
-    def _remove_item_buttons(self):
-        """Removes the use item and discard buttons from the UI."""
-        if self._use_item_button.winfo_ismapped:
-            self._use_item_button.place_forget()
-        if self._discard_item_button.winfo_ismapped:
-            self._discard_item_button.place_forget()
-
-    def _remove_save_buttons(self):
-        """Removes the save file and load file buttons from the UI."""
-        if self._save_file_button.winfo_ismapped:
-            self._save_file_button.place_forget()
-        if self._load_file_button.winfo_ismapped:
-            self._load_file_button.place_forget()
+        """Shows the pop-up window that reminds the player of the control scheme."""
+        self._show_popup(self._help_popup)
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Archon's Adventure")
+    parser.add_argument('--record', metavar='LOG', help='record the session to a log file')
+    parser.add_argument('--replay', metavar='LOG', help='replay a session log headlessly and report its speed')
+    parser.add_argument('--live', action='store_true', help='send replayed requests to the running services')
+    parser.add_argument('--profile', action='store_true', help='time handlers and report the slowest on exit')
+    parser.add_argument('--profile-dump', metavar='FILE', help='also write cProfile stats for the session to a file')
+    args = parser.parse_args()
+
     logic = GameLogic()
-    game = UI(logic)
+    profiler = None
+    if args.profile or args.profile_dump:
+        # Time the public game logic methods and the service requests, which is where any network waits show up
+        profiler = Profiler(args.profile_dump)
+        session_methods = ('start_recording', 'stop_recording', 'replay')
+        profiler.instrument(logic, [name for name, value in vars(GameLogic).items()
+                                    if callable(value) and name not in session_methods and
+                                    (not name.startswith('_') or name.startswith('_send_'))])
+        profiler.start()
+
+    if args.replay:
+        # Request logging is silenced so the replay runs at full speed
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            actions, elapsed = logic.replay(args.replay, args.live)
+        print(f"Replayed {actions} actions in {elapsed:.3f}s ({actions / max(elapsed, 1e-9):.0f} actions/s)")
+    else:
+        if args.record:
+            logic.start_recording(args.record)
+        try:
+            game = UI(logic, profiler)
+        finally:
+            logic.stop_recording()
+
+    if profiler is not None:
+        profiler.stop()
+        print(profiler.report())
@@ -0,0 +1,70 @@
+"""Measures the memory, query and save costs of the world state store at 10^5 and 10^6 touched tiles.
+
+Run with: python bench_world_state.py
+"""
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from world_state import WorldState, VISITED, CLEARED
+
+
+def touched_tiles(count, scattered):
+    """Returns the coordinates of the tiles to touch, either a dense square or scattered over a much larger map."""
+    if scattered:
+        rng = random.Random(361)
+        side = int((count * 20) ** 0.5)
+        return [(rng.randrange(side), rng.randrange(side)) for _ in range(count)]
+    side = int(count ** 0.5) + 1
+    return [(i % side, i // side) for i in range(count)]
+
+
+def bench(count, scattered, directory):
+    """Runs every measurement for one layout and prints a line of results."""
+    tiles = touched_tiles(count, scattered)
+    path = os.path.join(directory, f"world_{count}_{scattered}.dat")
+    world = WorldState(path)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for x, y in tiles:
+        world.mark("test_map", x, y, VISITED)
+    mark_time = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for x, y in tiles:
+        world.visited("test_map", x, y)
+    query_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    world.save()
+    full_save_time = time.perf_counter() - start
+    file_size = os.path.getsize(path)
+
+    # A typical play session between saves only touches a few hundred tiles
+    for x, y in tiles[:500]:
+        world.mark("test_map", x, y, CLEARED)
+        world.increment("test_map", x, y)
+    start = time.perf_counter()
+    world.save()
+    dirty_save_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    WorldState(path).load()
+    load_time = time.perf_counter() - start
+
+    layout = "scattered" if scattered else "dense"
+    print(f"{count:>8} {layout:<9} chunks={len(world):<6} memory={memory / 2 ** 20:7.1f}MiB "
+          f"mark={mark_time * 1e9 / count:5.0f}ns/tile query={query_time * 1e9 / count:5.0f}ns/tile "
+          f"full_save={full_save_time * 1000:7.1f}ms dirty_save={dirty_save_time * 1000:6.1f}ms "
+          f"file={file_size / 2 ** 20:6.1f}MiB load={load_time * 1000:7.1f}ms")
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        for count in (10 ** 5, 10 ** 6):
+            for scattered in (False, True):
+                bench(count, scattered, directory)
@@ -30,6 +30,21 @@ LOAD_WARNING_TEXT = textwrap.dedent("""
         Are you sure that you want to continue loading your previous save?
         """)
 
+TRAVEL_TEXT = textwrap.dedent("""
+        Enter the X and Y coordinates of the place you would like to travel to.\n
+        You will journey along the safest known route, but beware of what may lie in wait along the way.
+        """)
+
+TRAVEL_INVALID_TEXT = "\n Those coordinates make no sense, try whole numbers."
+
+NO_ROUTE_TEXT = textwrap.dedent("""
+        You study your surroundings, but you cannot find a way to get there from here.
+        """)
+
+TRAVEL_TOO_FAR_TEXT = textwrap.dedent("""
+        That place lies too far away to reach in a single journey. Pick somewhere closer and travel on from there.
+        """)
+
 GAME_OVER = textwrap.dedent("""
         What a pity... It would seem misfortune has befallen you.\n\n
         Would you like to turn back the clock?\n\n
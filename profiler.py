@@ -0,0 +1,76 @@
+import cProfile
+import functools
+import time
+
+
+class Profiler:
+    """A class that times the UI handlers and game logic methods, monitors Tk event loop lag and reports the results."""
+
+    def __init__(self, dump_path=None):
+        """Initialize the timing tables and, if a dump path is given, a cProfile profiler for the session"""
+        self._timings = {}
+        self._lags = []
+        self._dump_path = dump_path
+        self._cprofile = cProfile.Profile() if dump_path else None
+
+    def instrument(self, obj, names=None):
+        """Replaces methods of an object with timed versions. If no names are given, every method defined on the
+        object's class is timed. This must happen before the methods are handed to widgets as commands."""
+        cls = type(obj)
+        if names is None:
+            names = [name for name, value in vars(cls).items() if callable(value) and not name.startswith('__')]
+        for name in names:
+            setattr(obj, name, self._timed(f"{cls.__name__}.{name}", getattr(obj, name)))
+
+    def _timed(self, label, method):
+        """Returns a wrapper that adds the duration of every call to the timing table under the label."""
+        entry = self._timings.setdefault(label, [0, 0.0, 0.0])
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] = max(entry[2], elapsed)
+        return wrapper
+
+    def start_heartbeat(self, root, interval=50):
+        """Schedules a probe on the Tk event loop every interval milliseconds, recording how late each probe runs."""
+        def beat(expected):
+            now = time.perf_counter()
+            self._lags.append(max(now - expected, 0.0))
+            root.after(interval, beat, now + interval / 1000)
+        root.after(interval, beat, time.perf_counter() + interval / 1000)
+
+    def start(self):
+        """Begins the cProfile session, if one was requested."""
+        if self._cprofile is not None:
+            self._cprofile.enable()
+
+    def stop(self):
+        """Ends the cProfile session and writes its stats to the dump path."""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self._dump_path)
+
+    def report(self, top=10):
+        """Returns a summary of the slowest methods by total and worst case time, and of the event loop lag."""
+        lines = []
+        for title, column in (("total", 1), ("worst case", 2)):
+            lines.append(f"Top {top} by {title} time:")
+            ranked = sorted(self._timings.items(), key=lambda item: item[1][column], reverse=True)
+            for label, (calls, total, worst) in ranked[:top]:
+                if calls:
+                    lines.append(f"  {label:<36} calls={calls:<6} total={total * 1000:10.2f}ms "
+                                 f"worst={worst * 1000:8.2f}ms")
+        if self._lags:
+            mean = sum(self._lags) / len(self._lags)
+            lines.append(f"Event loop lag over {len(self._lags)} probes: mean={mean * 1000:.2f}ms "
+                         f"worst={max(self._lags) * 1000:.2f}ms")
+        if self._dump_path:
+            lines.append(f"cProfile stats written to {self._dump_path}")
+        return "\n".join(lines)
@@ -0,0 +1,180 @@
+import functools
+import json
+import struct
+import zlib
+from collections import deque
+import zmq
+
+# Every log starts with this header, followed by a zlib stream of records
+MAGIC = b'RPGSESS2'
+
+# Record kinds
+ACTION = 0
+REPLY = 1
+FAILURE = 2
+
+# Channels that replies are recorded on, the save file is treated like a service so loads can be replayed
+CHANNELS = ("random", "battle", "map", "enemy", "weather", "save")
+
+# Record header: kind, channel index, payload length
+_HEADER = struct.Struct('<BBI')
+
+
+class ReplayError(Exception):
+    """Raised when a replayed session asks for a reply that was never recorded."""
+
+
+class SessionRecorder:
+    """A class that writes player actions and service replies to a compact binary session log."""
+
+    def __init__(self, path):
+        """Open the log file and write the header"""
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._compressor = zlib.compressobj()
+        self.depth = 0
+
+    def _write(self, kind, channel, payload):
+        """Encode a single record and add it to the compressed stream."""
+        data = json.dumps(payload, separators=(',', ':'), default=lambda item: {"item": item.name}).encode()
+        self._file.write(self._compressor.compress(_HEADER.pack(kind, CHANNELS.index(channel), len(data)) + data))
+
+    def record_action(self, name, args):
+        """Records a player action."""
+        self._write(ACTION, CHANNELS[0], [name, list(args)])
+
+    def flush(self):
+        """Writes everything recorded so far to disk, so a crash still leaves a session that can be replayed."""
+        self._file.write(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+        self._file.flush()
+
+    def record_reply(self, channel, reply):
+        """Records a reply received from a service."""
+        self._write(REPLY, channel, reply)
+
+    def record_failure(self, channel, call, error):
+        """Records a ZMQ error raised by the send or recv call of a service socket, including timeouts."""
+        self._write(FAILURE, channel, [call, type(error).__name__, error.errno])
+
+    def close(self):
+        """Finish the compressed stream and close the log file."""
+        self._file.write(self._compressor.flush())
+        self._file.close()
+
+
+class SessionReplay:
+    """A class that holds a recorded session, split into the player actions and the replies of each channel."""
+
+    def __init__(self, path):
+        """Read and decode every record of the session log"""
+        with open(path, 'rb') as log:
+            if log.read(len(MAGIC)) != MAGIC:
+                raise ReplayError(f"{path} is not a session log")
+            data = zlib.decompressobj().decompress(log.read())
+
+        self.actions = []
+        self._replies = {channel: deque() for channel in CHANNELS}
+        offset = 0
+        # A log cut short by a crash may end partway through a record, which is ignored
+        while offset + _HEADER.size <= len(data):
+            kind, channel, length = _HEADER.unpack_from(data, offset)
+            offset += _HEADER.size
+            if offset + length > len(data):
+                break
+            payload = json.loads(data[offset:offset + length])
+            offset += length
+            if kind == ACTION:
+                self.actions.append(payload)
+            else:
+                self._replies[CHANNELS[channel]].append((kind, payload))
+
+    def next_reply(self, channel):
+        """Returns the next recorded reply on a channel, raising the recorded error if the recv call failed."""
+        if not self._replies[channel]:
+            raise ReplayError(f"session log has no more {channel} replies")
+        kind, payload = self._replies[channel].popleft()
+        if kind == FAILURE:
+            if payload[0] != 'recv':
+                raise ReplayError(f"session log expected a failed {channel} send")
+            raise _rebuild_error(payload)
+        return payload
+
+    def check_send(self, channel):
+        """Raises the recorded error if the next send call on a channel failed when the session was recorded."""
+        replies = self._replies[channel]
+        if replies and replies[0][0] == FAILURE and replies[0][1][0] == 'send':
+            raise _rebuild_error(replies.popleft()[1])
+
+
+def _rebuild_error(payload):
+    """Returns an exception of the recorded ZMQ error class and errno."""
+    _, name, errno = payload
+    error_class = getattr(zmq, name, zmq.ZMQError)
+    if not (isinstance(error_class, type) and issubclass(error_class, zmq.ZMQError)):
+        error_class = zmq.ZMQError
+    return error_class(errno)
+
+
+class RecordingSocket:
+    """A class that wraps a service socket and records every reply it receives."""
+
+    def __init__(self, sock, channel, recorder):
+        """Initialize the wrapped socket and the recorder it reports to"""
+        self._sock = sock
+        self._channel = channel
+        self._recorder = recorder
+
+    def send_json(self, msg):
+        """Sends the message on the wrapped socket, recording the error if the send fails."""
+        try:
+            self._sock.send_json(msg)
+        except zmq.ZMQError as e:
+            self._recorder.record_failure(self._channel, 'send', e)
+            raise
+
+    def recv_json(self):
+        """Receives and records a reply from the wrapped socket."""
+        try:
+            reply = self._sock.recv_json()
+        except zmq.ZMQError as e:
+            self._recorder.record_failure(self._channel, 'recv', e)
+            raise
+        self._recorder.record_reply(self._channel, reply)
+        return reply
+
+
+class ReplaySocket:
+    """A class that stands in for a service socket and answers with the replies of a recorded session."""
+
+    def __init__(self, channel, replay):
+        """Initialize the channel and the recorded session to answer from"""
+        self._channel = channel
+        self._replay = replay
+
+    def send_json(self, msg):
+        """Requests are not sent anywhere during a replay, but a send that failed when recorded fails again."""
+        self._replay.check_send(self._channel)
+
+    def recv_json(self):
+        """Returns the next recorded reply."""
+        return self._replay.next_reply(self._channel)
+
+
+def recorded(method):
+    """Decorates a GameLogic method so that calls made while recording are written to the session log. Calls made
+    from inside another recorded method are not logged, as replaying the outer call repeats them. The log is flushed
+    once the outer call and all of its replies have been recorded."""
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        recorder = self._recorder
+        if recorder is None or recorder.depth:
+            return method(self, *args)
+        recorder.record_action(method.__name__, args)
+        recorder.depth += 1
+        try:
+            return method(self, *args)
+        finally:
+            recorder.depth -= 1
+            if not recorder.depth:
+                recorder.flush()
+    return wrapper
@@ -0,0 +1,99 @@
+import pytest
+
+zmq = pytest.importorskip("zmq")
+
+import items
+import UI
+from session_log import SessionReplay, ReplaySocket
+from test_travel import StubMapSocket, StubSocket, make_logic
+
+
+@pytest.fixture
+def replayable(monkeypatch):
+    """UI only sees the item library when run as a script, replaying resets the game so it needs the items too."""
+    for name, value in vars(items).items():
+        if not name.startswith('_'):
+            monkeypatch.setattr(UI, name, value, raising=False)
+
+
+def record_session(logic, path):
+    """Plays a short session on the game while recording it, starting from a reset game as a replay does."""
+    logic.reset()
+    logic.start_recording(path)
+    logic.move_player('north')
+    logic.evaluate_encounter()
+    logic.travel_to(9, 7)
+    return logic
+
+
+def test_unclosed_log_replays(make_logic, replayable, tmp_path):
+    path = str(tmp_path / 'session.log')
+    recorded = record_session(make_logic(StubMapSocket(), [90, [90] * 10]), path)
+
+    # The game was never stopped, so the log was not closed
+    actions, _ = make_logic().replay(path)
+    assert actions == 3
+    assert recorded._player.position[1] == [9, 7]
+
+
+def test_unclosed_log_ending_in_an_unanswered_action_replays(make_logic, replayable, tmp_path):
+    path = str(tmp_path / 'session.log')
+    recorded = record_session(make_logic(StubMapSocket(), [90, [90] * 10]), path)
+
+    # The game hung waiting on the map service during this move
+    recorded._recorder.record_action('move_player', ['north'])
+    recorded._recorder.flush()
+
+    replayer = make_logic()
+    actions, _ = replayer.replay(path)
+    assert actions == 3
+    assert replayer._player.position[1] == [9, 7]
+
+
+class OutageSocket:
+    """A stand-in for a REQ socket whose service is down, it times out and then refuses to send again."""
+
+    def __init__(self):
+        self.waiting = False
+
+    def send_json(self, msg):
+        if self.waiting:
+            raise zmq.ZMQError(zmq.EFSM)
+        self.waiting = True
+
+    def recv_json(self):
+        raise zmq.Again(zmq.EAGAIN)
+
+
+def test_replay_restores_player_and_tile_state(make_logic, replayable, tmp_path):
+    path = str(tmp_path / 'session.log')
+    recorded = record_session(make_logic(StubMapSocket(), [90, [90, 5, 90, 90, 90, 90]]), path)
+    recorded.stop_recording()
+
+    replayer = make_logic()
+    actions, _ = replayer.replay(path)
+    assert actions == 3
+    assert vars(replayer._player) == vars(recorded._player)
+    assert replayer._tile_info == recorded._tile_info
+    assert replayer._weather == recorded._weather
+
+
+def test_replay_socket_repeats_timeout_and_failed_send(make_logic, replayable, tmp_path):
+    path = str(tmp_path / 'session.log')
+    logic = make_logic()
+    logic._socks['random'] = OutageSocket()
+    logic.start_recording(path)
+    assert logic.evaluate_encounter() is False
+    assert logic.evaluate_encounter() is False
+    logic.stop_recording()
+
+    sock = ReplaySocket('random', SessionReplay(path))
+    sock.send_json([1])
+    with pytest.raises(zmq.Again):
+        sock.recv_json()
+    with pytest.raises(zmq.ZMQError) as error:
+        sock.send_json([1])
+    assert error.value.errno == zmq.EFSM
+
+    # The whole session replays through the same failures
+    assert make_logic().replay(path)[0] == 2
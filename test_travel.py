@@ -0,0 +1,186 @@
+import pytest
+
+pytest.importorskip("zmq")
+
+# items must be imported before UI, as items imports the Item class from UI
+import items
+from UI import GameLogic, Player
+from world_state import WorldState
+
+
+class StubMapSocket:
+    """A stand-in for the map service on a 21x21 map, with per-tile statuses that can be overridden."""
+
+    def __init__(self, statuses=None, batches=True):
+        self.statuses = statuses or {}
+        self.batches = batches
+        self.requests = []
+
+    def send_json(self, msg):
+        self.requests.append(msg['data'])
+
+    def _tile(self, coords):
+        x, y = coords
+        status = self.statuses.get((x, y), 'success' if 0 <= x <= 20 and 0 <= y <= 20 else 'out_of_bounds')
+        return {'status': status,
+                'data': {'narration': f'tile {x},{y}', 'inspection': '', 'biome': 'plains', 'encounter': 10}}
+
+    def recv_json(self):
+        data = self.requests[-1]
+        if 'coords_batch' not in data:
+            return self._tile(data['coords'])
+        if not self.batches:
+            return {'status': 'error', 'data': {'narration': '', 'inspection': ''}}
+        return {'status': 'success', 'data': [self._tile(coords) for coords in data['coords_batch']]}
+
+    def fetched(self):
+        """Returns every tile asked for, in batches or one at a time."""
+        return [tuple(coords) for data in self.requests for coords in data.get('coords_batch', [data.get('coords')])]
+
+
+class StubSocket:
+    """A stand-in for a service that answers with a fixed list of replies."""
+
+    def __init__(self, replies=()):
+        self.replies = list(replies)
+        self.requests = []
+
+    def send_json(self, msg):
+        self.requests.append(msg)
+
+    def recv_json(self):
+        return self.replies.pop(0)
+
+
+@pytest.fixture
+def make_logic(tmp_path):
+    """Returns a factory for a game at (5, 5) whose services are stub sockets."""
+    def make(map_socket=None, random_replies=()):
+        # GameLogic.__init__ connects real sockets and reset() needs the item library, so the state is set directly
+        logic = GameLogic.__new__(GameLogic)
+        logic._recorder = None
+        logic._replay = None
+        logic._world = WorldState(str(tmp_path / 'world_state.dat'))
+        logic._player = Player({"name": "Hero",
+                                "stats": {"health": 25, "mana": 0, "attack": 6, "defense": 3},
+                                "inventory": [],
+                                "position": ["test_map", [5, 5]]})
+        logic._tile_info = {'narration': '', 'inspection': '', 'biome': '', 'encounter': 0}
+        logic._weather = 'Sunny'
+        logic._weather_count = 5
+        logic._known_tiles = {}
+        logic._socks = {'map': map_socket or StubMapSocket(),
+                        'random': StubSocket(random_replies),
+                        'weather': StubSocket([{'weather_state': 'Rainy'}] * 10)}
+        return logic
+    return make
+
+
+def test_plan_route_takes_shortest_path_over_open_ground(make_logic):
+    logic = make_logic()
+    path = logic._plan_route((5, 5), (9, 8))
+    assert len(path) == 7
+    assert path[-1] == (9, 8)
+
+
+def test_plan_route_avoids_known_out_of_bounds_tiles(make_logic):
+    logic = make_logic()
+    for y in range(0, 9):
+        logic._known_tiles[('test_map', 6, y)] = None
+    path = logic._plan_route((5, 5), (7, 5))
+    assert not any(step[0] == 6 and step[1] < 9 for step in path)
+    assert path[-1] == (7, 5)
+
+
+def test_plan_route_returns_none_for_blocked_goal(make_logic):
+    logic = make_logic()
+    logic._known_tiles[('test_map', 7, 5)] = None
+    assert logic._plan_route((5, 5), (7, 5)) is None
+
+
+def test_plan_route_expands_only_along_the_route_on_open_ground(make_logic):
+    logic = make_logic()
+    logic.MAX_ROUTE_SEARCH = 1000
+    assert len(logic._plan_route((0, 0), (400, 400))) == 800
+
+
+def test_plan_route_gives_up_after_search_limit(make_logic):
+    logic = make_logic()
+    logic.MAX_ROUTE_SEARCH = 10
+    assert logic._plan_route((0, 0), (40, 40)) is None
+
+
+def test_within_travel_range(make_logic):
+    logic = make_logic()
+    assert logic.within_travel_range(5 + logic.MAX_TRAVEL_DISTANCE, 5)
+    assert not logic.within_travel_range(5, 5 - logic.MAX_TRAVEL_DISTANCE - 1)
+
+
+def test_travel_to_refuses_distant_destination(make_logic):
+    map_socket = StubMapSocket()
+    logic = make_logic(map_socket)
+    assert logic.travel_to(5, 5 + logic.MAX_TRAVEL_DISTANCE + 1) is None
+    assert map_socket.requests == []
+
+
+def test_travel_to_arrives_with_one_batch_and_one_roll_request(make_logic):
+    map_socket = StubMapSocket()
+    logic = make_logic(map_socket, [[90, 90, 90, 90]])
+    assert logic.travel_to(9, 5) is False
+    assert logic._player.position[1] == [9, 5]
+    assert logic._tile_info['narration'] == 'tile 9,5'
+    assert len(map_socket.requests) == 1
+    assert logic.is_visited(7, 5)
+
+
+def test_travel_to_stops_at_first_encounter(make_logic):
+    logic = make_logic(random_replies=[[90, 5, 90, 90]])
+    assert logic.travel_to(9, 5) is True
+    assert logic._player.position[1] == [7, 5]
+    assert not logic.is_visited(8, 5)
+
+
+def test_travel_to_routes_around_error_tile_without_refetching_it(make_logic):
+    map_socket = StubMapSocket({(6, 5): 'error'})
+    logic = make_logic(map_socket, [[90] * 10])
+    assert logic.travel_to(8, 5) is False
+    assert logic._player.position[1] == [8, 5]
+    assert map_socket.fetched().count((6, 5)) == 1
+
+
+def test_travel_to_steps_one_tile_at_a_time_without_batch_support(make_logic):
+    map_socket = StubMapSocket(batches=False)
+    logic = make_logic(map_socket, [90, 90])
+    assert logic.travel_to(7, 5) is False
+    assert logic._player.position[1] == [7, 5]
+    assert [data.get('coords') for data in map_socket.requests[1:]] == [[6, 5], [7, 5]]
+
+
+def test_step_route_reports_blocked_step_as_no_route(make_logic):
+    logic = make_logic(StubMapSocket({(6, 5): 'out_of_bounds'}, batches=False), [90])
+    assert logic._step_route([(6, 5), (7, 5)]) is None
+    assert logic._player.position[1] == [5, 5]
+
+
+def test_send_value_request_pads_short_replies(make_logic):
+    logic = make_logic(random_replies=[[1, 2], 3, 4])
+    assert logic._send_value_request(4) == [1, 2, 3, 4]
+
+
+def test_send_value_request_pads_single_value_reply(make_logic):
+    logic = make_logic(random_replies=[7, 8])
+    assert logic._send_value_request(2) == [7, 8]
+
+
+def test_send_map_batch_request_splits_large_batches(make_logic):
+    map_socket = StubMapSocket()
+    logic = make_logic(map_socket)
+    logic.MAX_BATCH_TILES = 4
+    assert logic._send_map_batch_request([[x, 0] for x in range(10)]) is True
+    assert [len(data['coords_batch']) for data in map_socket.requests] == [4, 4, 2]
+    assert ('test_map', 9, 0) in logic._known_tiles
+
+
+def test_send_map_batch_request_reports_unsupported_batches(make_logic):
+    logic = make_logic(StubMapSocket(batches=False))
+    assert logic._send_map_batch_request([[6, 5]]) is False
@@ -0,0 +1,117 @@
+import os
+from world_state import WorldState, VISITED, CLEARED
+
+
+def reload(world_path):
+    """Returns a fresh world state read back from the save file."""
+    world = WorldState(world_path)
+    world.load()
+    return world
+
+
+def test_round_trip_negative_coordinates(tmp_path):
+    path = str(tmp_path / 'world_state.dat')
+    world = WorldState(path)
+    world.mark('test_map', -3, -17, VISITED)
+    world.mark('test_map', -16, 0, CLEARED)
+    world.save()
+
+    loaded = reload(path)
+    assert loaded.visited('test_map', -3, -17)
+    assert loaded.cleared('test_map', -16, 0)
+    assert not loaded.visited('test_map', 3, 17)
+    assert not loaded.visited('test_map', -16, 0)
+
+
+def test_round_trip_counters(tmp_path):
+    path = str(tmp_path / 'world_state.dat')
+    world = WorldState(path)
+    world.increment('test_map', 4, 5, 3)
+    world.increment('test_map', 4, 5)
+    world.increment('test_map', 0, 0, 70000)
+    world.mark('other_map', 1, 1, VISITED)
+    world.save()
+
+    loaded = reload(path)
+    assert loaded.count('test_map', 4, 5) == 4
+    assert loaded.count('test_map', 0, 0) == 0xFFFF
+    assert loaded.count('test_map', 5, 4) == 0
+    assert loaded.count('other_map', 1, 1) == 0
+
+
+def test_second_save_appends_and_later_record_wins(tmp_path):
+    path = str(tmp_path / 'world_state.dat')
+    world = WorldState(path)
+    world.mark('test_map', 1, 1, VISITED)
+    world.mark('test_map', 40, 40, VISITED)
+    world.save()
+    size = os.path.getsize(path)
+
+    world.mark('test_map', 2, 1, CLEARED)
+    world.save()
+    # Only the changed chunk is appended
+    assert size < os.path.getsize(path) < 2 * size
+
+    loaded = reload(path)
+    assert loaded.visited('test_map', 1, 1)
+    assert loaded.cleared('test_map', 2, 1)
+    assert loaded.visited('test_map', 40, 40)
+    assert len(loaded) == 2
+
+
+def test_too_many_stale_records_rewrite_the_file(tmp_path):
+    path = str(tmp_path / 'world_state.dat')
+    world = WorldState(path)
+    world.mark('test_map', 0, 0, VISITED)
+    world.save()
+    size = os.path.getsize(path)
+    for x in range(1, 5):
+        world.mark('test_map', x, 0, VISITED)
+        world.save()
+
+    assert os.path.getsize(path) <= 2 * size
+    assert all(reload(path).visited('test_map', x, 0) for x in range(5))
+
+
+def test_save_after_clear_replaces_the_file(tmp_path):
+    path = str(tmp_path / 'world_state.dat')
+    world = WorldState(path)
+    world.mark('test_map', 1, 1, VISITED)
+    world.mark('test_map', 40, 40, VISITED)
+    world.save()
+
+    world.clear()
+    world.mark('test_map', 3, 3, VISITED)
+    world.save()
+
+    loaded = reload(path)
+    assert loaded.visited('test_map', 3, 3)
+    assert not loaded.visited('test_map', 1, 1)
+    assert len(loaded) == 1
+
+
+def test_truncated_file_keeps_whole_records_and_is_rewritten(tmp_path):
+    path = str(tmp_path / 'world_state.dat')
+    world = WorldState(path)
+    world.mark('test_map', 1, 1, VISITED)
+    world.save()
+    world.mark('test_map', 40, 40, VISITED)
+    world.save()
+    with open(path, 'rb+') as save_data:
+        save_data.truncate(os.path.getsize(path) - 10)
+
+    loaded = reload(path)
+    assert loaded._rewrite
+    assert loaded.visited('test_map', 1, 1)
+    assert not loaded.visited('test_map', 40, 40)
+
+    # The next save replaces the damaged file, so later appends can be read back
+    loaded.mark('test_map', 2, 2, VISITED)
+    loaded.save()
+    assert not loaded._rewrite
+    loaded.mark('test_map', 40, 40, CLEARED)
+    loaded.save()
+    reloaded = reload(path)
+    assert not reloaded._rewrite
+    assert reloaded.visited('test_map', 2, 2)
+    assert reloaded.cleared('test_map', 40, 40)
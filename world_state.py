@@ -0,0 +1,156 @@
+import os
+import struct
+import sys
+from array import array
+
+# Tile flags
+VISITED = 1
+CLEARED = 2
+LOOTED = 4
+
+# Tiles are grouped into square chunks, which are the unit that is saved to disk
+CHUNK_SIZE = 16
+_CHUNK_TILES = CHUNK_SIZE * CHUNK_SIZE
+
+# Chunk record: map name length, chunk x, chunk y, whether counters follow the flags
+_RECORD = struct.Struct('<HiiB')
+
+
+class WorldState:
+    """A class that remembers the flags and counters of every tile the player has touched, keyed by map and coordinates.
+    Tiles are stored in chunks so that a query is one dictionary lookup, and only changed chunks are saved."""
+
+    def __init__(self, path='world_state.dat'):
+        """Initialize an empty world state that is saved to the given path"""
+        self._path = path
+        self._chunks = {}
+        self._dirty = set()
+        self._records = 0
+        self._rewrite = False
+
+    def _locate(self, map_name, x, y):
+        """Returns the key of the chunk holding a tile and the index of the tile inside it."""
+        cx, tx = divmod(x, CHUNK_SIZE)
+        cy, ty = divmod(y, CHUNK_SIZE)
+        return (map_name, cx, cy), ty * CHUNK_SIZE + tx
+
+    def _chunk(self, key):
+        """Returns the chunk for a key, creating it if it has not been touched yet."""
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            chunk = self._chunks[key] = [bytearray(_CHUNK_TILES), None]
+        return chunk
+
+    def mark(self, map_name, x, y, flag):
+        """Sets a flag on a tile."""
+        key, index = self._locate(map_name, x, y)
+        flags = self._chunk(key)[0]
+        if not flags[index] & flag:
+            flags[index] |= flag
+            self._dirty.add(key)
+
+    def has(self, map_name, x, y, flag):
+        """Returns True if a tile has a flag set."""
+        key, index = self._locate(map_name, x, y)
+        chunk = self._chunks.get(key)
+        return chunk is not None and bool(chunk[0][index] & flag)
+
+    def visited(self, map_name, x, y):
+        """Returns True if the player has stood on a tile."""
+        return self.has(map_name, x, y, VISITED)
+
+    def cleared(self, map_name, x, y):
+        """Returns True if the player has defeated an enemy on a tile."""
+        return self.has(map_name, x, y, CLEARED)
+
+    def increment(self, map_name, x, y, amount=1):
+        """Adds to the counter of a tile, counters stop at 65535."""
+        key, index = self._locate(map_name, x, y)
+        chunk = self._chunk(key)
+        if chunk[1] is None:
+            chunk[1] = array('H', bytes(2 * _CHUNK_TILES))
+        chunk[1][index] = min(chunk[1][index] + amount, 0xFFFF)
+        self._dirty.add(key)
+
+    def count(self, map_name, x, y):
+        """Returns the counter of a tile."""
+        key, index = self._locate(map_name, x, y)
+        chunk = self._chunks.get(key)
+        if chunk is None or chunk[1] is None:
+            return 0
+        return chunk[1][index]
+
+    def __len__(self):
+        """Returns the number of chunks that have been touched."""
+        return len(self._chunks)
+
+    def clear(self):
+        """Forgets the whole world, the next save replaces the save file."""
+        self._chunks.clear()
+        self._dirty.clear()
+        self._rewrite = True
+
+    def _encode(self, key):
+        """Returns the saved form of a chunk."""
+        map_name, cx, cy = key
+        flags, counters = self._chunks[key]
+        name = map_name.encode()
+        data = [_RECORD.pack(len(name), cx, cy, counters is not None), name, bytes(flags)]
+        if counters is not None:
+            if sys.byteorder == 'big':
+                counters = array('H', counters)
+                counters.byteswap()
+            data.append(counters.tobytes())
+        return b''.join(data)
+
+    def load(self):
+        """Reads the save file, later records of a chunk replace earlier ones. A damaged record and everything after it
+        is ignored, and the next save replaces the file."""
+        self._chunks.clear()
+        self._dirty.clear()
+        self._records = 0
+        self._rewrite = False
+        try:
+            with open(self._path, 'rb') as save_data:
+                data = save_data.read()
+        except FileNotFoundError:
+            return
+
+        offset = 0
+        try:
+            while offset < len(data):
+                name_length, cx, cy, has_counters = _RECORD.unpack_from(data, offset)
+                offset += _RECORD.size
+                map_name = data[offset:offset + name_length].decode()
+                offset += name_length
+                flags = bytearray(data[offset:offset + _CHUNK_TILES])
+                offset += _CHUNK_TILES
+                counters = None
+                if has_counters:
+                    counters = array('H', data[offset:offset + 2 * _CHUNK_TILES])
+                    if sys.byteorder == 'big':
+                        counters.byteswap()
+                    offset += 2 * _CHUNK_TILES
+                if len(flags) != _CHUNK_TILES or (counters is not None and len(counters) != _CHUNK_TILES):
+                    self._rewrite = True
+                    break
+                self._chunks[(map_name, cx, cy)] = [flags, counters]
+                self._records += 1
+        except (struct.error, UnicodeDecodeError, ValueError):
+            self._rewrite = True
+
+    def save(self):
+        """Appends the chunks that changed since the last save to the save file. If the file holds more than twice as
+        many records as there are chunks, or the world was cleared, a fresh snapshot is written instead."""
+        if self._rewrite or self._records + len(self._dirty) > 2 * max(len(self._chunks), 1):
+            temp_path = self._path + '.tmp'
+            with open(temp_path, 'wb') as save_data:
+                save_data.write(b''.join(self._encode(key) for key in self._chunks))
+            os.replace(temp_path, self._path)
+            self._records = len(self._chunks)
+            self._rewrite = False
+        elif self._dirty:
+            with open(self._path, 'ab') as save_data:
+                save_data.write(b''.join(self._encode(key) for key in self._dirty))
+            self._records += len(self._dirty)
+        self._dirty.clear()